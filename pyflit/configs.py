@@ -22,6 +22,21 @@ settings['allow_proxy'] = False
 settings['proxies'] = proxies
 
 settings['timeout'] = 30
+# Per-phase deadlines in seconds, `timeout` is used if None
+settings['connect_timeout'] = None
+settings['read_timeout'] = None
+# Deadline of the whole request including the content and the
+# redirections, None to disable
+settings['total_timeout'] = None
+
+# Hedged requests: send a duplicate GET or HEAD request if it takes longer
+# than the percentile of the recent latencies, the first response wins.
+# None to disable.
+settings['hedge_percentile'] = None
+# max ratio of the hedged requests to all requests
+settings['hedge_budget'] = 0.05
+# number of latencies to collect before hedging
+settings['hedge_min_samples'] = 20
 settings['accept_gzip'] = True
 
 # HTTP Redirection
@@ -37,6 +52,3 @@ codes = utils.DictDotLookup(dict_rev)
 
 # logging more info
 settings['verbose'] = sys.stdout
-
-# Use socket.setdefaulttimeout() as fallback
-settings['timeout_fallback'] = True
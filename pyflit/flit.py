@@ -1,12 +1,30 @@
 # -*- coding: utf-8 -*-
 
+import io
 import os
 import sys
 import shutil
+import copy
 import time
+from collections import OrderedDict, deque
 
 import socket
-from threading import Thread
+import select
+import zlib
+from threading import Thread, Lock, Condition
+from multiprocessing import Process, Pipe
+try:
+    from multiprocessing.connection import wait as wait_connections
+except ImportError:
+    # Python 2
+    def wait_connections(conns):
+        return select.select(conns, [], [])[0]
+
+try:
+    from concurrent.futures import Future
+except ImportError:
+    # Python 2 requires the `futures` backport
+    Future = None
 
 from .graunching import (
     RequestException,
@@ -23,12 +41,12 @@ if PY2:
     from urllib2 import Request, ProxyHandler, build_opener, HTTPError, URLError
     from urlparse import urlparse, urljoin, urlsplit
     from urllib import quote, unquote
-    from Queue import Queue
+    from Queue import Queue, PriorityQueue, Empty
 else:
     from urllib.request import Request, ProxyHandler, build_opener
     from urllib.parse import urlparse, urljoin, urlsplit, quote, unquote
     from urllib.error import HTTPError, URLError
-    from queue import Queue
+    from queue import Queue, PriorityQueue, Empty
 
 
 REDIRECT_STATE = (codes.moved, codes.found, codes.other, codes.temporary_moved)
@@ -69,6 +87,9 @@ def get_opener(handlers=[], headers={}, proxies={}):
     # redirect handler
     _handlers.append(utils.HTTPRedirectHandler)
 
+    # separate connect and read timeouts
+    _handlers.extend([utils.DeadlineHandler, utils.DeadlineHTTPSHandler])
+
     opener = build_opener(*_handlers)
 
     # Add HTTP Request Headers
@@ -93,10 +114,34 @@ def get_opener(handlers=[], headers={}, proxies={}):
     return opener
 
 
+def _copy_request(url_req):
+    """Return a copy of the Request object to set the attributes on,
+    or a new Request object of the URL.
+
+    Arguments:
+    - `url_req`: string, HTTP request URL or Request object.
+    """
+    if not isinstance(url_req, Request):
+        return Request(url_req)
+    req = copy.copy(url_req)
+    req.headers = dict(url_req.headers)
+    req.unredirected_hdrs = dict(url_req.unredirected_hdrs)
+    return req
+
+
+def _is_timeout(error):
+    """Check if the error is caused by a socket timeout."""
+    return isinstance(error, socket.timeout) or \
+        isinstance(getattr(error, 'reason', None), socket.timeout)
+
+
 class PyFlitRequest(object):
     """A simple class to process HTTP url requests, e.g. get the http response,
     process the url content, and more.
     """
+    # number of recent latencies kept to decide the hedging delay
+    latency_window = 1000
+
     def __init__(self, opener, config=settings):
         """
         Arguments:
@@ -110,7 +155,15 @@ class PyFlitRequest(object):
         # Configurations for the request
         self.config = dict(config or [])
 
-    def build_resp(self, resp, is_error):
+        # Latency statistics shared by the threads for hedged requests,
+        # time to the content and time to the headers are kept apart
+        self._lock = Lock()
+        self._latencies = {True: deque(maxlen=self.latency_window),
+                           False: deque(maxlen=self.latency_window)}
+        self._requests = 0
+        self._hedges = 0
+
+    def build_resp(self, resp, is_error, deadline=None):
         """Build URL response to generate a dictionary with
         its original url address, status code, headers, content,
         charset, and the response itself if error occurred.
@@ -118,6 +171,7 @@ class PyFlitRequest(object):
         Arguments:
         - `resp`: HTTPResponse, Response object.
         - `is_error`: Boolean, flag to tell whether error occurred.
+        - `deadline`: float, time.time() the redirections must finish by.
         """
         def build(resp, is_error=False):
             response = dict()
@@ -167,7 +221,7 @@ class PyFlitRequest(object):
                     url_re = urljoin(rurl,
                                      quote(unquote(url_re)))
                     print(url_re)
-                r = self.get_url_chunk(url_re)
+                r = self.get_url_chunk(url_re, deadline)
                 rurl = r.get('url')
                 status_code = r.get('status_code')
                 headers = r.get('headers')
@@ -176,37 +230,38 @@ class PyFlitRequest(object):
 
         return r
 
-    def get_url_response(self, url_req):
+    def get_url_response(self, url_req, read_content=False, deadline=None):
         """Send HTTP URL request, return the response
         with a flag to check if error occurs.
 
         Arguments:
         - `url_req`: string, HTTP request URL or Request object.
+        - `read_content`: Boolean, read the content in the deadline of
+                          the `total_timeout` setting if it is given.
+        - `deadline`: float, time.time() the request must finish by,
+                      now plus the `total_timeout` setting if not given.
         """
         is_error = False
 
         if not url_req:
             raise URLRequired
 
+        timeout = self.config.get('connect_timeout') or \
+            self.config.get('timeout')
+        read_timeout = self.config.get('read_timeout')
+        # the deadline handlers keep the socket on the request
+        req = _copy_request(url_req)
+        req.read_timeout = read_timeout or self.config.get('timeout')
+
         try:
-            try:
-                resp = self._opener.open(url_req,
-                                         timeout=self.config.get('timeout'))
-            except TypeError as err:
-                if 'timeout' not in str(err):
-                    raise
-                if self.config.get('timeout_fallback'):
-                    old_timeout = socket.getdefaulttimeout()
-                    socket.setdefaulttimeout(self.config.get('timeout'))
-
-                resp = self._opener.open(url_req)
-
-                if self.config.get('timeout_fallback'):
-                    socket.setdefaulttimeout(old_timeout)
-        except (HTTPError, URLError) as why:
-            if hasattr(why, 'reason'):
-                if isinstance(why.reason, socket.timeout):
-                    why = Timeout(why)
+            if self._use_deadline():
+                resp = self._open_with_deadline(req, timeout, read_content,
+                                                deadline)
+            else:
+                resp = self._opener.open(req, timeout=timeout)
+        except (HTTPError, URLError, socket.timeout) as why:
+            if _is_timeout(why):
+                why = Timeout(why)
 
             print("\n==> %s\n    when visit '%s'" % (why, url_req))
             is_error = True
@@ -214,15 +269,181 @@ class PyFlitRequest(object):
         else:
             return (resp, is_error)
 
-    def get_url_chunk(self, url_req):
+    def _use_deadline(self):
+        return bool(self.config.get('total_timeout') or
+                    self.config.get('hedge_percentile'))
+
+    def _open_with_deadline(self, req, timeout, read_content=False,
+                            deadline=None):
+        """Open the request in working threads, the response or error
+        of the first finished attempt is returned.
+
+        A duplicate attempt of GET or HEAD request is sent if the first
+        one takes longer than the hedging delay, the request fails with
+        a timeout error after the deadline, the running attempts are
+        aborted.
+
+        Arguments:
+        - `req`: Request object.
+        - `timeout`: float, connect timeout in seconds.
+        - `read_content`: Boolean, read the content in the attempt,
+                          or return the response after the headers.
+        - `deadline`: float, time.time() the request must finish by,
+                      now plus the `total_timeout` setting if not given.
+        """
+        total_timeout = self.config.get('total_timeout')
+        hedge_delay = None
+        # never send the requests not idempotent twice
+        if req.get_method() in ('GET', 'HEAD'):
+            hedge_delay = self._hedge_delay(read_content)
+        with self._lock:
+            self._requests += 1
+
+        start = time.time()
+        if deadline is None and total_timeout:
+            deadline = start + total_timeout
+        results = Queue()
+        attempts = []
+
+        def attempt():
+            attempt_req = _copy_request(req)
+            attempts.append(attempt_req)
+            task = Thread(target=self._attempt,
+                          args=(attempt_req, timeout, read_content, results))
+            task.daemon = True
+            task.start()
+
+        attempt()
+        pending = 1
+        error = None
+        winner = None
+        try:
+            while pending:
+                now = time.time()
+                wait = None
+                if deadline is not None:
+                    wait = deadline - now
+                if hedge_delay is not None:
+                    hedge_wait = start + hedge_delay - now
+                    if wait is None or hedge_wait < wait:
+                        wait = hedge_wait
+                try:
+                    if wait is None:
+                        result = results.get()
+                    else:
+                        result = results.get(timeout=max(wait, 0.001))
+                except Empty:
+                    if deadline is not None and time.time() >= deadline:
+                        # the tail latency counts for the hedging delay
+                        self._record_latency(read_content,
+                                             time.time() - start)
+                        raise URLError(socket.timeout(
+                            "total deadline exceeded"))
+                    # hedging delay reached
+                    hedge_delay = None
+                    if self._take_hedge():
+                        attempt()
+                        pending += 1
+                    continue
+
+                pending -= 1
+                attempt_req, succeeded, resp, latency = result
+                if succeeded:
+                    winner = attempt_req
+                    self._record_latency(read_content, latency)
+                    if isinstance(resp, HTTPError):
+                        raise resp
+                    return resp
+                if _is_timeout(resp):
+                    self._record_latency(read_content, latency)
+                error = resp
+            raise error
+        finally:
+            for attempt_req in attempts:
+                if attempt_req is not winner:
+                    utils.abort_request(attempt_req)
+
+    def _attempt(self, req, timeout, read_content, results):
+        """Working thread process of an attempt of the request, put
+        (request, succeeded, response or error, latency) into `results`.
+        """
+        start = time.time()
+        try:
+            resp = self._opener.open(req, timeout=timeout)
+            if not read_content:
+                results.put((req, True, resp, time.time() - start))
+                return
+            try:
+                content = resp.read()
+            finally:
+                resp.close()
+            buffered = utils.addinfourl(utils.StringIO(content),
+                                        resp.info(),
+                                        resp.geturl(),
+                                        resp.getcode())
+            buffered.msg = getattr(resp, 'msg', None)
+            results.put((req, True, buffered, time.time() - start))
+        except HTTPError as e:
+            results.put((req, True, e, time.time() - start))
+        except Exception as e:
+            results.put((req, False, e, time.time() - start))
+
+    def _record_latency(self, read_content, latency):
+        with self._lock:
+            self._latencies[read_content].append(latency)
+
+    def _hedge_delay(self, read_content):
+        """Return the latency percentile to send a hedged request,
+        or None if hedging is disabled or not enough latencies.
+
+        Arguments:
+        - `read_content`: Boolean, use the latencies to the content
+                          or to the headers.
+        """
+        percentile = self.config.get('hedge_percentile')
+        if not percentile:
+            return None
+        with self._lock:
+            latencies = self._latencies[read_content]
+            if len(latencies) < self.config.get('hedge_min_samples', 20):
+                return None
+            latencies = sorted(latencies)
+        index = int(len(latencies) * percentile / 100.0)
+        return latencies[min(index, len(latencies) - 1)]
+
+    def _take_hedge(self):
+        """Count a hedged request if it is in the budget.
+        """
+        with self._lock:
+            if self._hedges + 1 > \
+               self._requests * self.config.get('hedge_budget', 0):
+                return False
+            self._hedges += 1
+            return True
+
+    def get_url_chunk(self, url_req, deadline=None):
         """Open HTTP URL and return the data chunk dictionary,
         see method `PyFlitRequest.build_resp()` to find the keys in it.
 
         Arguments:
         - `url_req`: string, HTTP request URL or Request object.
+        - `deadline`: float, time.time() the request and its redirections
+                      must finish by, now plus the `total_timeout` setting
+                      if not given.
+
+        Raise the error if there is no response, e.g. `Timeout`
+        or `URLError` when failed to connect.
         """
-        resp, is_error = self.get_url_response(url_req)
-        chunk = self.build_resp(resp, is_error)
+        total_timeout = self.config.get('total_timeout')
+        if deadline is None and total_timeout:
+            deadline = time.time() + total_timeout
+        resp, is_error = self.get_url_response(url_req, True, deadline)
+        if is_error and not isinstance(resp, HTTPError):
+            raise resp
+        try:
+            chunk = self.build_resp(resp, is_error, deadline)
+        except socket.timeout as why:
+            raise Timeout(why)
         return chunk
 
     def get_url_headers(self, url_req):
@@ -394,10 +615,359 @@ class MultiTasking(object):
         self.queue_chunk.join()
 
 
+class FetchPool(object):
+    """Long-lived multi-threaded downloading pool, URLs could be submitted
+    at any time and each one returns a `concurrent.futures.Future` of its
+    data chunk.
+    """
+    def __init__(self, threads_number, opener, config=settings):
+        """
+        Arguments:
+        - `threads_number`: int, number of threads to download.
+        - `opener`: OpenerDirector object,
+                    call its open() method to open url request.
+        - `config`: dictionary, a bunch of settings, see the config module.
+        """
+        if Future is None:
+            raise ImportError("FetchPool requires concurrent.futures, "
+                              "install the `futures` package on Python 2")
+        self.flitter = PyFlitRequest(opener, config)
+        self.queue_task = PriorityQueue()
+        self._lock = Lock()
+        self._count = 0  # keep the submitted order of the same priority
+        self._shutdown = False
+
+        self._threads = []
+        for _ in range(threads_number):
+            task_thread = Thread(target=self._work)
+            task_thread.daemon = True
+            task_thread.start()
+            self._threads.append(task_thread)
+
+    def submit(self, url_req, priority=0):
+        """Queue the URL to fetch and return the Future of its data chunk,
+        see `PyFlitRequest.build_resp()` to find the keys in it.
+
+        Arguments:
+        - `url_req`: string, HTTP request URL or Request object.
+        - `priority`: int, URLs of lower value are fetched first.
+        """
+        future = Future()
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError("cannot submit after shutdown")
+            self._count += 1
+            self.queue_task.put((priority, self._count, future, url_req))
+        return future
+
+    def map(self, tasks, priority=0):
+        """Submit the URLs and return the list of Futures.
+
+        Arguments:
+        - `tasks`: list, HTTP URLs to fetch.
+        - `priority`: int, URLs of lower value are fetched first.
+        """
+        return [self.submit(task, priority) for task in tasks]
+
+    def shutdown(self, wait=True, cancel_pending=False):
+        """Stop accepting URLs, the threads exit after the queued URLs
+        are fetched.
+
+        Arguments:
+        - `wait`: Boolean, wait until the threads exit.
+        - `cancel_pending`: Boolean, cancel the URLs not started yet,
+                            the running ones are still finished.
+        """
+        with self._lock:
+            if not self._shutdown:
+                self._shutdown = True
+                if cancel_pending:
+                    while 1:
+                        try:
+                            item = self.queue_task.get_nowait()
+                        except Empty:
+                            break
+                        item[2].cancel()
+                # sentinels are fetched after all the queued URLs
+                for _ in self._threads:
+                    self._count += 1
+                    self.queue_task.put((float('inf'), self._count,
+                                         None, None))
+        if wait:
+            for task_thread in self._threads:
+                task_thread.join()
+
+    def _work(self):
+        """HTTP url downloading thread of the pool.
+        """
+        while 1:
+            priority, count, future, url_req = self.queue_task.get()
+            if future is None:
+                break
+            # skip cancelled
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(self.flitter.get_url_chunk(url_req))
+            except Exception as e:
+                future.set_exception(e)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.shutdown(wait=True)
+        return False
+
+
+def _portable_chunk(chunk):
+    """Strip the data chunk of the objects that couldn't be passed
+    between processes, i.e. the response file object and the error
+    response, which is replaced by a `RequestException`.
+
+    Arguments:
+    - `chunk`: dictionary, data chunk, see `PyFlitRequest.build_resp()`.
+    """
+    chunk.pop('fo', None)
+    if 'error' in chunk:
+        chunk['error'] = RequestException(str(chunk['error']))
+    if chunk.get('history'):
+        chunk['history'] = [_portable_chunk(r) for r in chunk['history']]
+    return chunk
+
+
+def _processing_worker(tasks, threads_number, opener_args, conn):
+    """Working process of multi-processing downloading, fetch the tasks
+    with its own opener and threads then send back the data chunks.
+
+    Arguments:
+    - `tasks`: list, HTTP URLs to fetch.
+    - `threads_number`: int, number of threads to download.
+    - `opener_args`: tuple, arguments to call `get_opener()`.
+    - `conn`: Connection, the sending end of the process's own pipe.
+    """
+    try:
+        request = PyFlitRequest(get_opener(*opener_args))
+        flitter = MultiTasking(threads_number, request.get_url_chunk)
+        for chunk in flitter(tasks):
+            conn.send(_portable_chunk(chunk))
+        # signals to the main process that the shard is done
+        conn.send(None)
+    except Exception as e:
+        print("\n==> Error in fetching process")
+        print(e)
+    finally:
+        conn.close()
+
+
+class MultiProcessing(object):
+    """Multi-processed of multi-tasks downloading, tasks are sharded by
+    host so that each process reuses the connections of its own hosts.
+    """
+    def __init__(self, processes_number, threads_number,
+                 handlers=[], headers={}, proxies={}):
+        """
+        Arguments:
+        - `processes_number`: int, number of processes to download.
+        - `threads_number`: int, number of threads in each process.
+        - `handlers`, `headers`, `proxies`: arguments to build the opener
+                 in each process, see `get_opener()`.
+        """
+        self._processes_number = processes_number
+        self._threads_number = threads_number
+        self._opener_args = (handlers, headers, proxies)
+        self.processes = []
+
+    def shard_tasks(self, tasks):
+        """Split tasks into lists by the host of the URL.
+
+        Arguments:
+        - `tasks`: list, HTTP URLs to fetch.
+        """
+        shards = [[] for _ in range(self._processes_number)]
+        for task in tasks:
+            url = task
+            if isinstance(task, Request):
+                url = task.get_full_url()
+            host = urlsplit(url)[1].lower().encode('utf-8')
+            shards[zlib.crc32(host) % self._processes_number].append(task)
+        return [shard for shard in shards if shard]
+
+    def __call__(self, tasks=[]):
+        """
+        Arguments:
+        - `tasks`: list, HTTP URLs to fetch.
+        """
+        # Each process sends through its own pipe, a process killed
+        # while sending couldn't block the others by a shared lock,
+        # and its pipe is closed by the system, so the broken or
+        # missing message ends in EOFError.
+        shards = self.shard_tasks(tasks)
+        readers = {}
+        self.processes = []
+        for shard in shards:
+            reader, writer = Pipe(duplex=False)
+            process = Process(target=_processing_worker,
+                              args=(shard,
+                                    self._threads_number,
+                                    self._opener_args,
+                                    writer))
+            process.daemon = True
+            process.start()
+            # only the process holds the sending end
+            writer.close()
+            readers[reader] = (process, shard)
+            self.processes.append(process)
+
+        while readers:
+            for reader in wait_connections(list(readers)):
+                process, shard = readers[reader]
+                try:
+                    chunk = reader.recv()
+                except (EOFError, IOError, OSError):
+                    process.join()
+                    print("\n==> Fetching process exited with code %s "
+                          "before finishing its %d tasks" %
+                          (process.exitcode, len(shard)))
+                    chunk = None
+                if chunk is None:
+                    reader.close()
+                    del readers[reader]
+                    continue
+                yield chunk
+
+        for process in self.processes:
+            process.join()
+
+
+class SegmentWriter(Thread):
+    """Write-behind disk writer of multi-segment file downloading,
+    the segment threads hand the fetched buffers to it and keep reading
+    from the network while the disk I/O catches up.
+    """
+    # buffer size of the files to coalesce the writes
+    file_buffering = 262144
+
+    def __init__(self, max_buffered=16777216, flush_interval=1.0):
+        """
+        Arguments:
+        - `max_buffered`: int, max bytes of buffers waiting to be written,
+                          `write()` blocks when it is reached.
+        - `flush_interval`: float, seconds between flushes of the files.
+        """
+        Thread.__init__(self)
+        self.daemon = True
+        self._queue = Queue()
+        self._max_buffered = max_buffered
+        self._buffered = 0
+        self._buffered_cond = Condition()
+        self._flush_interval = flush_interval
+        self._files = {}
+        self.error = None
+
+    def write(self, filename, data):
+        """Queue the data to append to the file, block while the bytes
+        waiting to be written would exceed `max_buffered`, raise the error
+        if writing has failed.
+
+        Arguments:
+        - `filename`: string, output file name.
+        - `data`: bytes, data to write.
+        """
+        with self._buffered_cond:
+            # a buffer larger than the cap is let through alone
+            while self._buffered and not self.error and \
+                    self._buffered + len(data) > self._max_buffered:
+                self._buffered_cond.wait()
+            if self.error:
+                raise self.error
+            self._buffered += len(data)
+        self._queue.put((filename, data))
+
+    def close(self):
+        """Wait for the queued buffers to be written and close the files,
+        raise the error if writing failed.
+        """
+        self._queue.put(None)
+        self.join()
+        if self.error:
+            raise self.error
+
+    def run(self):
+        """Working thread process of the disk writer.
+        """
+        last_flush = time.time()
+        done = False
+        while not done:
+            items = [self._queue.get()]
+            # coalesce the buffers already queued
+            while 1:
+                try:
+                    items.append(self._queue.get_nowait())
+                except Empty:
+                    break
+
+            buffers = OrderedDict()
+            for item in items:
+                if item is None:
+                    done = True
+                    continue
+                filename, data = item
+                buffers.setdefault(filename, []).append(data)
+
+            for filename, datas in buffers.items():
+                self._write(filename, datas)
+                self._release(sum([len(data) for data in datas]))
+
+            if time.time() - last_flush >= self._flush_interval:
+                self._flush()
+                last_flush = time.time()
+
+        for fileobj in self._files.values():
+            try:
+                fileobj.close()
+            except (IOError, OSError) as e:
+                self.error = self.error or e
+        self._files.clear()
+
+    def _release(self, size):
+        """Give back the bytes written, or dropped after error,
+        and wake up the blocked segment threads.
+        """
+        with self._buffered_cond:
+            self._buffered -= size
+            self._buffered_cond.notify_all()
+
+    def _write(self, filename, datas):
+        # Buffers queued before the error are dropped, the segment
+        # threads get the error from write().
+        if self.error:
+            return
+        try:
+            fileobj = self._files.get(filename)
+            if fileobj is None:
+                fileobj = self._files[filename] = open(
+                    filename, "ab+", self.file_buffering)
+            fileobj.writelines(datas)
+        except (IOError, OSError) as e:
+            self.error = e
+
+    def _flush(self):
+        if self.error:
+            return
+        try:
+            for fileobj in self._files.values():
+                fileobj.flush()
+        except (IOError, OSError) as e:
+            self.error = e
+
+
 class SegmentingThread(Thread):
     """Multi-segment file downloading thread.
     """
-    def __init__(self, opener, url_req, filename, ranges=0):
+    size_per_time = 16384  # 16KByte/time
+
+    def __init__(self, opener, url_req, filename, ranges=0, writer=None):
         """
         Arguments:
         - `opener`: OpenerDirector object,
@@ -405,6 +975,8 @@ class SegmentingThread(Thread):
         - `url_req`: string, http request URL.
         - `filename`: string, output file name.
         - `ranges`: list, start to end mark of the url fetch range.
+        - `writer`: SegmentWriter, write the file behind if given,
+                    or write the file in this thread.
         """
         Thread.__init__(self)
         self.daemon = True
@@ -412,6 +984,7 @@ class SegmentingThread(Thread):
         self._url_req = url_req
         self._filename = filename
         self._ranges = ranges
+        self._writer = writer
         self.fetched = 0
 
     def run(self):
@@ -429,8 +1002,6 @@ class SegmentingThread(Thread):
             # print("Part %s has been fetched over." % self._filename)
             return
 
-        self.size_per_time = 16384  # 16KByte/time
-
         # Add range to headers
         req = Request(self._url_req)
         req.add_header("Range",
@@ -439,11 +1010,14 @@ class SegmentingThread(Thread):
         self.chunkhandle = self._opener.open(req)
         chunk = self.chunkhandle.read(self.size_per_time)
         while chunk:
-            fileobj = open(self._filename, "ab+")
-            try:
-                fileobj.write(chunk)
-            finally:
-                fileobj.close()
+            if self._writer:
+                self._writer.write(self._filename, chunk)
+            else:
+                fileobj = open(self._filename, "ab+")
+                try:
+                    fileobj.write(chunk)
+                finally:
+                    fileobj.close()
 
             self.fetched += len(chunk)
             chunk = self.chunkhandle.read(self.size_per_time)
@@ -452,13 +1026,16 @@ class SegmentingThread(Thread):
 class MultiSegmenting(object):
     """Multi-segment file downloading for fetching big size file.
     """
-    def __init__(self, opener):
+    def __init__(self, opener, max_buffered=16777216):
         """
         Arguments:
         - `opener`: OpenerDirector object,
                     call its open() method to open url request.
+        - `max_buffered`: int, max bytes of fetched data waiting to be
+                          written to disk, see `SegmentWriter`.
         """
         self._opener = opener
+        self._max_buffered = max_buffered
         self.flitter = PyFlitRequest(self._opener)
 
     def split_segment(self, url_size, segment_number):
@@ -470,7 +1047,7 @@ class MultiSegmenting(object):
         - `segment_number`: int,
                             the numbers you want to separate the file size.
         """
-        segment_size = url_size / segment_number
+        segment_size = url_size // segment_number
         ranges = [(i * segment_size,
                    (i + 1) * segment_size - 1)
                   for i in range(segment_number - 1)]
@@ -479,7 +1056,7 @@ class MultiSegmenting(object):
 
     def _islive(self, tasks):
         for task in tasks:
-            if task.isAlive():
+            if task.is_alive():
                 return True
         return False
 
@@ -490,12 +1067,16 @@ class MultiSegmenting(object):
         output = self.flitter.get_url_file_name(url_req)
         filename = ["%s_tmp_%d.pfb" % (output, i) for i in range(segments)]
 
+        writer = SegmentWriter(self._max_buffered)
+        writer.start()
+
         tasks = []
         for i in range(segments):
             task = SegmentingThread(self._opener,
                                     url_req,
                                     filename[i],
-                                    ranges[i])
+                                    ranges[i],
+                                    writer)
             task.start()
             tasks.append(task)
 
@@ -504,6 +1085,8 @@ class MultiSegmenting(object):
             fetched = sum([t.fetched for t in tasks])
             utils.progressbar(url_size, fetched)
 
+        writer.close()
+
         fileobj = open(output, 'wb+')
         try:
             for i in filename:
@@ -518,6 +1101,231 @@ class MultiSegmenting(object):
             utils.progressbar(url_size, finished_size, 100)
 
 
+class RemoteFile(io.RawIOBase):
+    """Seekable read-only file object of a remote URL, only the bytes
+    touched are fetched by HTTP Range requests.
+
+    Fetched data is kept in a LRU cache of fixed size blocks, adjacent
+    missing blocks are merged into one request, and sequential reads
+    prefetch the following blocks.
+    """
+    def __init__(self, opener, url_req, block_size=65536, cache_blocks=64,
+                 readahead=4, size=None):
+        """
+        Arguments:
+        - `opener`: OpenerDirector object,
+                    call its open() method to open url request.
+        - `url_req`: string, HTTP request URL or Request object.
+        - `block_size`: int, size of the cached blocks in bytes.
+        - `cache_blocks`: int, max number of blocks kept in the cache.
+        - `readahead`: int, number of blocks prefetched on sequential reads.
+        - `size`: int, remote file size, got from the `Content-Range`
+                  header of a one byte range request if not given.
+        """
+        io.RawIOBase.__init__(self)
+        self._url_req = url_req
+        self.flitter = PyFlitRequest(opener)
+        self.block_size = block_size
+        self.cache_blocks = max(cache_blocks, 1)
+        self.readahead = readahead
+        self.requests = 0  # number of range requests sent
+        self.size = size or self._fetch_size()
+
+        self._pos = 0
+        self._last_end = None  # end of the last read, to detect sequence
+        self._cache = OrderedDict()
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        """Change the stream position and return the new absolute position.
+
+        Arguments:
+        - `offset`: int, offset relative to the position given by `whence`.
+        - `whence`: int, io.SEEK_SET, io.SEEK_CUR or io.SEEK_END.
+        """
+        if self.closed:
+            raise ValueError("I/O operation on closed file.")
+        if whence == io.SEEK_SET:
+            pos = offset
+        elif whence == io.SEEK_CUR:
+            pos = self._pos + offset
+        elif whence == io.SEEK_END:
+            pos = self.size + offset
+        else:
+            raise ValueError("Invalid whence (%r)" % whence)
+        if pos < 0:
+            raise ValueError("Negative seek position %d" % pos)
+        self._pos = pos
+        return self._pos
+
+    def read(self, size=-1):
+        """Read at most `size` bytes from the current position,
+        read until EOF if `size` is negative or omitted.
+
+        Arguments:
+        - `size`: int, number of bytes to read.
+        """
+        if self.closed:
+            raise ValueError("I/O operation on closed file.")
+        if size is None or size < 0:
+            end = self.size
+        else:
+            end = min(self._pos + size, self.size)
+        if self._pos >= end:
+            return b''
+
+        data = self._read_range(self._pos, end)
+        self._pos = end
+        return data
+
+    def readall(self):
+        return self.read()
+
+    def readinto(self, b):
+        """Read bytes into a pre-allocated writable buffer `b`,
+        return the number of bytes read.
+        """
+        data = self.read(len(b))
+        n = len(data)
+        b[:n] = data
+        return n
+
+    def close(self):
+        self._cache.clear()
+        io.RawIOBase.close(self)
+
+    def _read_range(self, start, end):
+        """Return the bytes between `start` and `end` (exclusive),
+        from the cache or by fetching the missing blocks.
+        """
+        bs = self.block_size
+        first = start // bs
+        last = (end - 1) // bs
+
+        blocks = {}
+        missing = []
+        for idx in range(first, last + 1):
+            data = self._cache_get(idx)
+            if data is None:
+                missing.append(idx)
+            else:
+                blocks[idx] = data
+
+        # Sequential read, prefetch the following blocks
+        if missing and self.readahead and start == self._last_end:
+            max_idx = (self.size - 1) // bs
+            for idx in range(last + 1,
+                             min(last + self.readahead, max_idx) + 1):
+                if idx not in self._cache:
+                    missing.append(idx)
+        self._last_end = end
+
+        for run_first, run_last in self._runs(missing):
+            data = self._fetch(run_first * bs,
+                               min((run_last + 1) * bs, self.size))
+            for idx in range(run_first, run_last + 1):
+                offset = (idx - run_first) * bs
+                block = data[offset:offset + bs]
+                self._cache_put(idx, block)
+                if idx <= last:
+                    blocks[idx] = block
+
+        data = b''.join([blocks[idx] for idx in range(first, last + 1)])
+        return data[start - first * bs:end - first * bs]
+
+    def _runs(self, indexes):
+        """Merge the sorted block indexes into (first, last) tuples
+        of adjacent blocks.
+        """
+        runs = []
+        for idx in indexes:
+            if runs and runs[-1][1] + 1 == idx:
+                runs[-1] = (runs[-1][0], idx)
+            else:
+                runs.append((idx, idx))
+        return runs
+
+    def _cache_get(self, idx):
+        data = self._cache.pop(idx, None)
+        if data is not None:
+            # mark as the most recently used
+            self._cache[idx] = data
+        return data
+
+    def _cache_put(self, idx, data):
+        self._cache.pop(idx, None)
+        self._cache[idx] = data
+        while len(self._cache) > self.cache_blocks:
+            self._cache.popitem(last=False)
+
+    def _open_range(self, start, end):
+        """Send a Range request of the bytes between `start` and `end`
+        (exclusive) and return the partial content response.
+        """
+        req = _copy_request(self._url_req)
+        req.add_header("Range", "bytes=%d-%d" % (start, end - 1))
+        # the range of encoded content couldn't be decoded alone
+        req.add_header("Accept-Encoding", "identity")
+        resp, is_error = self.flitter.get_url_response(req)
+        if is_error:
+            raise RequestException("Couldn't fetch range %d-%d\n"
+                                   "[URL]: %s" % (start, end - 1,
+                                                  self._url_req))
+        self.requests += 1
+        if resp.getcode() != 206:
+            resp.close()
+            raise RequestException("Range request not supported\n"
+                                   "[URL]: %s" % self._url_req)
+        encoding = resp.info().get('Content-Encoding', 'identity')
+        if encoding != 'identity':
+            resp.close()
+            raise RequestException("Range of '%s' encoded content\n"
+                                   "[URL]: %s" % (encoding, self._url_req))
+        return resp
+
+    def _fetch_size(self):
+        """Get the remote file size from the `Content-Range` header
+        of the first byte, e.g. 'bytes 0-0/1234'.
+        """
+        resp = self._open_range(0, 1)
+        try:
+            content_range = resp.info().get('Content-Range', '')
+            resp.read()
+        finally:
+            resp.close()
+
+        total = content_range.rpartition('/')[2]
+        if not total.isdigit():
+            raise RequestException("Couldn't get file size from "
+                                   "Content-Range: '%s'\n[URL]: %s" %
+                                   (content_range, self._url_req))
+        return int(total)
+
+    def _fetch(self, start, end):
+        """Fetch the bytes between `start` and `end` (exclusive)
+        with one Range request.
+        """
+        resp = self._open_range(start, end)
+        try:
+            data = resp.read()
+        finally:
+            resp.close()
+
+        if len(data) != end - start:
+            raise RequestException("Range %d-%d returned %d bytes\n"
+                                   "[URL]: %s" % (start, end - 1, len(data),
+                                                  self._url_req))
+        return data
+
+
 def flit_tasks(tasks, threads_number, opener=get_opener()):
     """Multiple tasks downloading and process the data chunk, mostly used
     when grabbing amount of web pages.
@@ -534,6 +1342,24 @@ def flit_tasks(tasks, threads_number, opener=get_opener()):
     return chunks
 
 
+def flit_processes(tasks, processes_number, threads_number,
+                   handlers=[], headers={}, proxies={}):
+    """Multiple tasks downloading with multiple processes, tasks are
+    sharded by host, each process has its own opener and threads.
+
+    Arguments:
+    - `tasks`: list, HTTP URLs to fetch.
+    - `processes_number`: int, number of processes to download.
+    - `threads_number`: int, number of threads in each process.
+    - `handlers`, `headers`, `proxies`: arguments to build the opener
+                 in each process, see `get_opener()`.
+    """
+    flitter = MultiProcessing(processes_number, threads_number,
+                              handlers, headers, proxies)
+    chunks = flitter(tasks)
+    return chunks
+
+
 def flit_segments(url_req, segment_number=2, opener=get_opener()):
     """Multiple segment file downloading, a replacement of wget. ;-)
 
@@ -547,3 +1373,15 @@ def flit_segments(url_req, segment_number=2, opener=get_opener()):
     # reset segment_number to 1.
     flitter = MultiSegmenting(opener)
     flitter(url_req, segment_number)
+
+
+def flit_open(url_req, opener=get_opener(), **kwargs):
+    """Open a remote file lazily as a seekable read-only file object,
+    see `RemoteFile` for the keyword arguments.
+
+    Arguments:
+    - `url_req`: string, HTTP request URL or Request object.
+    - `opener`: OpenerDirector object,
+                call its open() method to open url request.
+    """
+    return RemoteFile(opener, url_req, **kwargs)
@@ -0,0 +1,312 @@
+# -*- coding: utf-8 -*-
+
+"""
+Archive sinks to persist the data chunks of `flit.flit_tasks()`.
+
+The chunks are streamed into rolling segment files, each record is
+compressed as an independent gzip member in a writer thread, and an
+index of the URL to the segment file, offset and length of its record
+is kept for random access later.
+"""
+
+import os
+import re
+import sys
+import time
+import json
+import uuid
+import zlib
+import base64
+from threading import Thread, Lock
+from collections import OrderedDict
+
+PY2 = sys.version_info[0] == 2
+if PY2:
+    from Queue import Queue, Empty
+    from httplib import responses
+else:
+    from queue import Queue, Empty
+    from http.client import responses
+
+
+def _to_bytes(s, encoding='utf-8'):
+    if isinstance(s, bytes):
+        return s
+    return s.encode(encoding)
+
+
+def _header_items(headers):
+    """Return the (name, value) tuple list of the response headers.
+    """
+    if not headers:
+        return []
+    return list(headers.items())
+
+
+def load_index(path):
+    """Load the index file of a sink into a dictionary of
+    URL to (segment file name, offset, length).
+
+    Arguments:
+    - `path`: string, index file path.
+    """
+    index = {}
+    with open(path, 'rb') as f:
+        for line in f:
+            url, filename, offset, length = \
+                line.decode('utf-8').rstrip('\n').split('\t')
+            index[url] = (filename, int(offset), int(length))
+    return index
+
+
+def read_record(path, offset, length):
+    """Read and decompress one record from a segment file.
+
+    Arguments:
+    - `path`: string, segment file path.
+    - `offset`: int, offset of the record in the segment file.
+    - `length`: int, compressed length of the record.
+    """
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        data = f.read(length)
+    return zlib.decompress(data, 16 + zlib.MAX_WBITS)
+
+
+class ArchiveSink(Thread):
+    """Base class of the archive sinks, call `write()` with each data chunk
+    and `close()` when finished, subclasses implement `serialize()`.
+    The writer thread starts on the first `write()`.
+    """
+    extension = ''
+
+    def __init__(self, directory, prefix='pyflit', segment_size=1073741824,
+                 max_pending=1024, compress_level=6):
+        """
+        Arguments:
+        - `directory`: string, output directory of the segment files.
+        - `prefix`: string, file name prefix of the segment and index files.
+        - `segment_size`: int, bytes to roll over to a new segment file.
+        - `max_pending`: int, max chunks waiting to be written,
+                         `write()` blocks when it is reached.
+        - `compress_level`: int, gzip compression level from 1 to 9.
+        """
+        Thread.__init__(self)
+        self.daemon = True
+        self._directory = directory
+        self._prefix = prefix
+        self._segment_size = segment_size
+        self._compress_level = compress_level
+        self._queue = Queue(max_pending)
+        self._segment = None
+        self._start_lock = Lock()
+        self.error = None
+        self.records = 0
+
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        self._segment_number = self._next_segment_number()
+        self.index_path = os.path.join(directory, '%s.idx' % prefix)
+        self._index = open(self.index_path, 'ab')
+
+    def serialize(self, chunk):
+        """Serialize the data chunk into the bytes of one record.
+
+        Arguments:
+        - `chunk`: dictionary, data chunk, see `PyFlitRequest.build_resp()`.
+        """
+        raise NotImplementedError
+
+    def write(self, chunk):
+        """Queue the data chunk to be archived, raise the error
+        if archiving has failed.
+
+        Arguments:
+        - `chunk`: dictionary, data chunk, see `PyFlitRequest.build_resp()`.
+        """
+        if self.error:
+            raise self.error
+        self._start()
+        self._queue.put(chunk)
+
+    def consume(self, chunks):
+        """Archive all the data chunks, e.g. returned by `flit_tasks()`,
+        then close the sink and return the number of records.
+        Stop consuming at once if archiving fails.
+
+        Arguments:
+        - `chunks`: iterable, data chunks.
+        """
+        try:
+            for chunk in chunks:
+                self.write(chunk)
+        finally:
+            self.close()
+        return self.records
+
+    def close(self):
+        """Wait for the queued chunks to be written and close the files,
+        raise the error if archiving failed.
+        """
+        # started to close the files even if nothing was written
+        self._start()
+        if self.is_alive():
+            self._queue.put(None)
+            self.join()
+        if self.error:
+            raise self.error
+
+    def run(self):
+        """Working thread process of the archive sink.
+        """
+        done = False
+        while not done:
+            chunks = [self._queue.get()]
+            # batch the chunks already queued
+            while 1:
+                try:
+                    chunks.append(self._queue.get_nowait())
+                except Empty:
+                    break
+
+            if None in chunks:
+                done = True
+                chunks = [c for c in chunks if c is not None]
+
+            # Chunks queued before write() saw the error are dropped,
+            # the queue is still drained so write() never blocks on it.
+            if chunks and not self.error:
+                try:
+                    self._write_batch(chunks)
+                except Exception as e:
+                    self.error = e
+
+        for f in (self._segment, self._index):
+            if f is None:
+                continue
+            try:
+                f.close()
+            except (IOError, OSError) as e:
+                self.error = self.error or e
+
+    def _start(self):
+        with self._start_lock:
+            if self.ident is None:
+                self.start()
+
+    def _next_segment_number(self):
+        """Return the number after the existing segment files of
+        the prefix, so that a new run never appends to them.
+        """
+        pattern = re.compile(r'^%s-(\d+)%s$' % (re.escape(self._prefix),
+                                                re.escape(self.extension)))
+        numbers = [int(match.group(1))
+                   for match in map(pattern.match,
+                                    os.listdir(self._directory))
+                   if match]
+        return numbers and max(numbers) + 1 or 0
+
+    def _compress(self, data):
+        # every record is an independent gzip member to be read alone
+        compressor = zlib.compressobj(self._compress_level,
+                                      zlib.DEFLATED,
+                                      16 + zlib.MAX_WBITS)
+        return compressor.compress(data) + compressor.flush()
+
+    def _open_segment(self):
+        if self._segment is not None:
+            self._segment.close()
+        filename = '%s-%05d%s' % (self._prefix, self._segment_number,
+                                  self.extension)
+        self._segment_number += 1
+        self._segment = open(os.path.join(self._directory, filename), 'ab')
+        self._segment_name = filename
+
+    def _write_batch(self, chunks):
+        if self._segment is None:
+            self._open_segment()
+
+        offset = self._segment.tell()
+        records = []
+        index = []
+        for chunk in chunks:
+            record = self._compress(self.serialize(chunk))
+            if offset and offset + len(record) > self._segment_size:
+                self._flush_batch(records, index)
+                records, index = [], []
+                self._open_segment()
+                offset = self._segment.tell()
+            records.append(record)
+            index.append(u'%s\t%s\t%d\t%d\n' % (chunk.get('url'),
+                                                self._segment_name,
+                                                offset,
+                                                len(record)))
+            offset += len(record)
+        self._flush_batch(records, index)
+
+    def _flush_batch(self, records, index):
+        if not records:
+            return
+        self._segment.write(b''.join(records))
+        self._segment.flush()
+        self._index.write(_to_bytes(u''.join(index)))
+        self._index.flush()
+        self.records += len(records)
+
+
+class JSONLSink(ArchiveSink):
+    """Archive the data chunks into gzip compressed JSON lines files,
+    the content is base64 encoded.
+    """
+    extension = '.jsonl.gz'
+
+    def serialize(self, chunk):
+        record = OrderedDict()
+        record['url'] = chunk.get('url')
+        record['status_code'] = chunk.get('status_code')
+        record['headers'] = _header_items(chunk.get('headers'))
+        record['charset'] = chunk.get('charset')
+        record['content'] = base64.b64encode(
+            chunk.get('content') or b'').decode('ascii')
+        record['history'] = [(r.get('url'), r.get('status_code'))
+                             for r in chunk.get('history') or []]
+        if 'error' in chunk:
+            record['error'] = str(chunk['error'])
+        return _to_bytes(json.dumps(record)) + b'\n'
+
+
+class WARCSink(ArchiveSink):
+    """Archive the data chunks into gzip compressed WARC/1.0 files
+    of response records.
+
+    The content has been decoded by the opener, so `Content-Encoding`
+    and `Transfer-Encoding` headers are dropped and `Content-Length`
+    is set to the length of the archived content.
+    """
+    extension = '.warc.gz'
+
+    _skip_headers = ('content-encoding', 'transfer-encoding', 'content-length')
+
+    def serialize(self, chunk):
+        content = chunk.get('content') or b''
+        status_code = chunk.get('status_code') or 0
+
+        http = ['HTTP/1.1 %d %s' % (status_code,
+                                    responses.get(status_code, ''))]
+        for name, value in _header_items(chunk.get('headers')):
+            if name.lower() in self._skip_headers:
+                continue
+            http.append('%s: %s' % (name, value))
+        http.append('Content-Length: %d' % len(content))
+        block = _to_bytes('\r\n'.join(http) + '\r\n\r\n', 'latin-1') + content
+
+        warc = ['WARC/1.0',
+                'WARC-Type: response',
+                'WARC-Record-ID: <urn:uuid:%s>' % uuid.uuid4(),
+                'WARC-Date: %s' % time.strftime('%Y-%m-%dT%H:%M:%SZ',
+                                                time.gmtime()),
+                'WARC-Target-URI: %s' % chunk.get('url'),
+                'Content-Type: application/http; msgtype=response',
+                'Content-Length: %d' % len(block)]
+        return (_to_bytes('\r\n'.join(warc) + '\r\n\r\n') +
+                block + b'\r\n\r\n')
@@ -7,6 +7,7 @@ Utility functions.
 import os
 import sys
 import time
+import socket
 
 # gzip/deflate/bzip2 support
 from gzip import GzipFile
@@ -19,14 +20,18 @@ import pprint
 PY2 = sys.version_info[0] == 2
 if PY2:
     from urllib2 import BaseHandler, HTTPRedirectHandler
+    from urllib2 import HTTPHandler, HTTPSHandler
     from urllib import addinfourl
+    from httplib import HTTPConnection, HTTPSConnection
     try:
         from cStringIO import StringIO
     except ImportError:
         from StringIO import StringIO
 else:
     from urllib.request import BaseHandler, HTTPRedirectHandler
+    from urllib.request import HTTPHandler, HTTPSHandler
     from urllib.response import addinfourl
+    from http.client import HTTPConnection, HTTPSConnection
     from io import BytesIO
     StringIO = BytesIO
 
@@ -47,7 +52,9 @@ class ContentEncodingProcessor(BaseHandler):
 
     # add headers to requests
     def http_request(self, req):
-        req.add_header("Accept-Encoding", "gzip, deflate")
+        # keep the encoding given by the request, e.g. 'identity'
+        if not req.has_header("Accept-encoding"):
+            req.add_header("Accept-Encoding", "gzip, deflate")
         return req
 
     # decode
@@ -81,6 +88,87 @@ class HTTPRedirectHandler(HTTPRedirectHandler):
     http_error_302 = http_error_303 = http_error_307 = http_error_301
 
 
+def _apply_deadline(conn):
+    """Switch the connected socket of the connection to the read timeout,
+    and register it on the request so that it could be aborted.
+    """
+    if conn.read_timeout is not None:
+        conn.sock.settimeout(conn.read_timeout)
+    if conn.url_req is not None:
+        conn.url_req.pyflit_sock = conn.sock
+        if getattr(conn.url_req, 'pyflit_aborted', False):
+            abort_request(conn.url_req)
+
+
+class DeadlineHTTPConnection(HTTPConnection):
+    """HTTP connection with separate connect and read timeouts."""
+    def __init__(self, host, read_timeout=None, url_req=None, **kwargs):
+        HTTPConnection.__init__(self, host, **kwargs)
+        self.read_timeout = read_timeout
+        self.url_req = url_req
+
+    def connect(self):
+        HTTPConnection.connect(self)
+        _apply_deadline(self)
+
+
+class DeadlineHTTPSConnection(HTTPSConnection):
+    """HTTPS connection with separate connect and read timeouts."""
+    def __init__(self, host, read_timeout=None, url_req=None, **kwargs):
+        HTTPSConnection.__init__(self, host, **kwargs)
+        self.read_timeout = read_timeout
+        self.url_req = url_req
+
+    def connect(self):
+        HTTPSConnection.connect(self)
+        _apply_deadline(self)
+
+
+def _deadline_connection(http_class, req):
+    def connection(host, **kwargs):
+        return http_class(host,
+                          read_timeout=getattr(req, 'read_timeout', None),
+                          url_req=req,
+                          **kwargs)
+    return connection
+
+
+def abort_request(req):
+    """Shut down the socket of a running request opened by the deadline
+    handlers, the blocked read in the other thread fails at once.
+
+    Arguments:
+    - `req`: Request object.
+    """
+    req.pyflit_aborted = True
+    sock = getattr(req, 'pyflit_sock', None)
+    if sock is not None:
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except (socket.error, OSError):
+            pass
+
+
+class DeadlineHandler(HTTPHandler):
+    """
+    HTTP handler to apply separate connect and read timeouts, the connect
+    timeout is the `timeout` of the opener's open() method, the read
+    timeout is the `read_timeout` attribute of the request if given.
+    """
+    def do_open(self, http_class, req, **kwargs):
+        return HTTPHandler.do_open(
+            self, _deadline_connection(DeadlineHTTPConnection, req),
+            req, **kwargs)
+
+
+class DeadlineHTTPSHandler(HTTPSHandler):
+    """HTTPS version of `DeadlineHandler`."""
+    def do_open(self, http_class, req, **kwargs):
+        return HTTPSHandler.do_open(
+            self, _deadline_connection(DeadlineHTTPSConnection, req),
+            req, **kwargs)
+
+
 def progressbar(total_volume, completed_volume, progress=0):
     """A simple progressbar.
 
@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+
+"""
+Local HTTP server for the tests.
+"""
+
+import re
+import sys
+import gzip
+import time
+import unittest
+from threading import Thread
+
+PY2 = sys.version_info[0] == 2
+if PY2:
+    from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+    from SocketServer import ThreadingMixIn
+else:
+    from http.server import HTTPServer, BaseHTTPRequestHandler
+    from socketserver import ThreadingMixIn
+
+
+DATA = bytes(bytearray(i % 251 for i in range(300000)))
+
+
+def _gzip(data):
+    if PY2:
+        from StringIO import StringIO
+        buf = StringIO()
+        f = gzip.GzipFile(fileobj=buf, mode='wb')
+        f.write(data)
+        f.close()
+        return buf.getvalue()
+    return gzip.compress(data)
+
+
+GZIP_DATA = _gzip(DATA)
+
+
+class Handler(BaseHTTPRequestHandler):
+    """Handler of the test paths:
+
+    - `/file`: DATA, with range requests support.
+    - `/gzfile`: DATA, the ranges are of the gzip encoded content
+      if the client accepts gzip.
+    - `/stall`: respond after a stall.
+    - `/slowbody`: send the headers at once, then stall before the body.
+    - `/redirect`: redirect to `/slowend` after a third of the stall.
+    - `/slowend`: respond after a third of the stall.
+    """
+    protocol_version = 'HTTP/1.0'
+
+    def do_HEAD(self):
+        self.do_GET(head=True)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.do_GET()
+
+    def do_GET(self, head=False):
+        self.server.log.append((self.command, self.path,
+                                self.headers.get('Range')))
+        if self.path.startswith('/file'):
+            self._send_file(DATA, head)
+        elif self.path.startswith('/gzfile'):
+            if 'gzip' in self.headers.get('Accept-Encoding', ''):
+                self._send_file(GZIP_DATA, head, {'Content-Encoding': 'gzip'})
+            else:
+                self._send_file(DATA, head)
+        elif self.path.startswith('/stall'):
+            time.sleep(self.server.stall)
+            self._send(200, b'stalled')
+        elif self.path.startswith('/slowbody'):
+            self.send_response(200)
+            self.send_header('Content-Length', '4')
+            self.end_headers()
+            self.wfile.flush()
+            time.sleep(self.server.stall)
+            self.wfile.write(b'body')
+        elif self.path.startswith('/redirect'):
+            time.sleep(self.server.stall / 3.0)
+            self._send(302, b'', {'Location': '/slowend'})
+        elif self.path.startswith('/slowend'):
+            time.sleep(self.server.stall / 3.0)
+            self._send(200, b'end')
+        else:
+            self._send(404, b'not found')
+
+    def _send(self, code, body, headers={}, head=False):
+        self.send_response(code)
+        self.send_header('Content-Length', str(len(body)))
+        for key, val in headers.items():
+            self.send_header(key, val)
+        self.end_headers()
+        if not head:
+            self.wfile.write(body)
+
+    def _send_file(self, data, head, headers={}):
+        rng = self.headers.get('Range')
+        if not rng:
+            return self._send(200, data, headers, head)
+        start, end = map(int, re.match(r'bytes=(\d+)-(\d+)', rng).groups())
+        end = min(end, len(data) - 1)
+        headers = dict(headers)
+        headers['Content-Range'] = 'bytes %d-%d/%d' % (start, end, len(data))
+        self._send(206, data[start:end + 1], headers, head)
+
+    def log_message(self, *args):
+        pass
+
+
+class LocalServer(ThreadingMixIn, HTTPServer):
+    """Threaded test server on a free local port, logs the
+    (method, path, Range header) of the requests.
+    """
+    daemon_threads = True
+
+    def __init__(self, stall=2):
+        HTTPServer.__init__(self, ('127.0.0.1', 0), Handler)
+        self.stall = stall
+        self.log = []
+        self.thread = Thread(target=self.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def url(self, path):
+        return 'http://127.0.0.1:%d%s' % (self.server_address[1], path)
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+class ServerTestCase(unittest.TestCase):
+    """Test case with a `LocalServer` shared by the tests of the class."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = LocalServer()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
@@ -0,0 +1,305 @@
+# -*- coding: utf-8 -*-
+
+import os
+import time
+import shutil
+import tempfile
+import signal
+import socket
+import unittest
+from threading import Thread
+
+from pyflit import flit
+from pyflit.flit import URLError
+from pyflit.graunching import Timeout
+from pyflit.configs import settings
+
+from .server import ServerTestCase, DATA
+
+
+def get_request(**config):
+    _config = dict(settings)
+    _config.update(config)
+    return flit.PyFlitRequest(flit.get_opener(), _config)
+
+
+class DeadlineTest(ServerTestCase):
+
+    def test_total_timeout(self):
+        request = get_request(total_timeout=0.5)
+        self.assertRaises(Timeout, request.get_url_chunk,
+                          self.server.url('/stall'))
+
+    def test_read_timeout(self):
+        request = get_request(read_timeout=0.5)
+        self.assertRaises(Timeout, request.get_url_chunk,
+                          self.server.url('/stall'))
+
+    def test_read_timeout_in_content(self):
+        request = get_request(read_timeout=0.5)
+        self.assertRaises(Timeout, request.get_url_chunk,
+                          self.server.url('/slowbody'))
+
+    def test_headers_without_content(self):
+        request = get_request(total_timeout=0.5)
+        headers = request.get_url_headers(self.server.url('/slowbody'))
+        self.assertEqual(headers.get('Content-Length'), '4')
+
+    def test_chunk_in_deadline(self):
+        request = get_request(total_timeout=5, hedge_percentile=90)
+        chunk = request.get_url_chunk(self.server.url('/file'))
+        self.assertEqual(chunk['status_code'], 200)
+        self.assertEqual(len(chunk['content']), 300000)
+
+    def test_deadline_over_redirects(self):
+        # each hop takes a third of the stall
+        request = get_request(total_timeout=self.server.stall / 2.0)
+        self.assertRaises(Timeout, request.get_url_chunk,
+                          self.server.url('/redirect'))
+
+        request = get_request(total_timeout=self.server.stall * 2)
+        chunk = request.get_url_chunk(self.server.url('/redirect'))
+        self.assertEqual(chunk['content'], b'end')
+        self.assertEqual(len(chunk['history']), 1)
+
+    def hedged_request(self):
+        request = get_request(total_timeout=0.5, hedge_percentile=50,
+                              hedge_min_samples=1, hedge_budget=1)
+        request.get_url_chunk(self.server.url('/file'))
+        return request
+
+    def count_log(self, method, path):
+        return self.server.log.count((method, path, None))
+
+    def test_hedge_get(self):
+        request = self.hedged_request()
+        self.assertRaises(Timeout, request.get_url_chunk,
+                          self.server.url('/stall?hedge'))
+        time.sleep(0.1)
+        self.assertEqual(self.count_log('GET', '/stall?hedge'), 2)
+
+    def test_never_hedge_post(self):
+        request = self.hedged_request()
+        req = flit.Request(self.server.url('/stall?post'), data=b'data')
+        self.assertRaises(Timeout, request.get_url_chunk, req)
+        time.sleep(0.1)
+        self.assertEqual(self.count_log('POST', '/stall?post'), 1)
+
+    def test_timeout_latency(self):
+        request = get_request(total_timeout=0.5, hedge_percentile=90)
+        self.assertRaises(Timeout, request.get_url_chunk,
+                          self.server.url('/stall'))
+        self.assertEqual(len(request._latencies[True]), 1)
+        self.assertTrue(request._latencies[True][0] >= 0.5)
+
+        request.get_url_headers(self.server.url('/file'))
+        self.assertEqual(len(request._latencies[False]), 1)
+
+    def test_request_not_modified(self):
+        req = flit.Request(self.server.url('/file'))
+        request = get_request(read_timeout=5, total_timeout=5)
+        request.get_url_chunk(req)
+        self.assertFalse(hasattr(req, 'read_timeout'))
+        self.assertFalse(hasattr(req, 'pyflit_sock'))
+
+
+class FetchPoolTest(ServerTestCase):
+
+    def test_result(self):
+        with flit.FetchPool(2, flit.get_opener()) as pool:
+            future = pool.submit(self.server.url('/file'))
+            self.assertEqual(len(future.result()['content']), 300000)
+
+    def test_connection_error(self):
+        # a free port without server listening
+        sock = socket.socket()
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+        sock.close()
+
+        with flit.FetchPool(1, flit.get_opener()) as pool:
+            future = pool.submit('http://127.0.0.1:%d/' % port)
+            self.assertIsInstance(future.exception(), URLError)
+
+    def test_timeout_error(self):
+        config = dict(settings, total_timeout=0.5)
+        with flit.FetchPool(1, flit.get_opener(), config) as pool:
+            future = pool.submit(self.server.url('/stall'))
+            self.assertIsInstance(future.exception(), Timeout)
+
+    def test_shutdown_cancel_pending(self):
+        pool = flit.FetchPool(1, flit.get_opener())
+        running = pool.submit(self.server.url('/stall'))
+        pending = pool.submit(self.server.url('/file'))
+        while not running.running():
+            time.sleep(0.01)
+        pool.shutdown(cancel_pending=True)
+        self.assertEqual(running.result()['status_code'], 200)
+        self.assertTrue(pending.cancelled())
+
+
+class MultiProcessingTest(ServerTestCase):
+
+    def test_chunks(self):
+        port = self.server.server_address[1]
+        tasks = ['http://127.0.0.1:%d/file' % port,
+                 'http://localhost:%d/file' % port]
+        chunks = list(flit.flit_processes(tasks, 2, 1))
+        self.assertEqual(len(chunks), 2)
+        self.assertNotIn('fo', chunks[0])
+
+    def test_killed_process(self):
+        flitter = flit.MultiProcessing(1, 1)
+        chunks = flitter([self.server.url('/stall')])
+
+        def kill():
+            while not flitter.processes:
+                time.sleep(0.01)
+            time.sleep(0.5)
+            os.kill(flitter.processes[0].pid, signal.SIGKILL)
+        killer = Thread(target=kill)
+        killer.start()
+        start = time.time()
+        self.assertEqual(list(chunks), [])
+        self.assertLess(time.time() - start, self.server.stall)
+        killer.join()
+
+
+class RemoteFileTest(ServerTestCase):
+
+    def setUp(self):
+        del self.server.log[:]
+        self.remote = flit.flit_open(self.server.url('/file'),
+                                     flit.get_opener(),
+                                     block_size=1000,
+                                     cache_blocks=16,
+                                     readahead=4)
+
+    def ranges(self):
+        return [log[2] for log in self.server.log]
+
+    def test_size_by_range(self):
+        self.assertEqual(self.remote.size, len(DATA))
+        self.assertEqual(self.ranges(), ['bytes=0-0'])
+        self.assertEqual(self.remote.requests, 1)
+
+    def test_merge_missing_blocks(self):
+        self.remote.seek(10500)
+        self.assertEqual(self.remote.read(2000), DATA[10500:12500])
+        self.assertEqual(self.ranges()[1:], ['bytes=10000-12999'])
+
+        # cached
+        self.remote.seek(10000)
+        self.assertEqual(self.remote.read(3000), DATA[10000:13000])
+        self.assertEqual(self.remote.requests, 2)
+
+    def test_readahead(self):
+        self.remote.seek(10000)
+        self.remote.read(1000)
+        self.assertEqual(self.remote.read(1000), DATA[11000:12000])
+        self.assertEqual(self.ranges()[1:], ['bytes=10000-10999',
+                                             'bytes=11000-15999'])
+        for i in range(12000, 16000, 1000):
+            self.assertEqual(self.remote.read(1000), DATA[i:i + 1000])
+        self.assertEqual(self.remote.requests, 3)
+
+    def test_read_all(self):
+        self.assertEqual(self.remote.read(), DATA)
+        self.assertEqual(self.remote.requests, 2)
+        self.assertEqual(self.remote.read(), b'')
+
+    def test_identity_encoding(self):
+        remote = flit.flit_open(self.server.url('/gzfile'),
+                                flit.get_opener(),
+                                block_size=1000)
+        self.assertEqual(remote.size, len(DATA))
+        remote.seek(5000)
+        self.assertEqual(remote.read(3000), DATA[5000:8000])
+
+    def test_request_object(self):
+        req = flit.Request(self.server.url('/file'))
+        remote = flit.flit_open(req, flit.get_opener(), block_size=1000)
+        self.assertEqual(remote.read(1500), DATA[:1500])
+        self.assertFalse(req.has_header('Range'))
+
+    def test_seek_end_readinto(self):
+        self.remote.seek(-10, 2)
+        buf = bytearray(20)
+        self.assertEqual(self.remote.readinto(buf), 10)
+        self.assertEqual(bytes(buf[:10]), DATA[-10:])
+
+
+class SegmentWriterTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def read(self, name):
+        with open(self.path(name), 'rb') as f:
+            return f.read()
+
+    def test_buffers_in_order(self):
+        writer = flit.SegmentWriter()
+        for i in range(100):
+            writer.write(self.path('a'), b'a%d,' % i)
+            writer.write(self.path('b'), b'b%d,' % i)
+        # all the buffers are queued before writing
+        writer.start()
+        writer.close()
+        self.assertEqual(self.read('a'),
+                         b''.join([b'a%d,' % i for i in range(100)]))
+        self.assertEqual(self.read('b'),
+                         b''.join([b'b%d,' % i for i in range(100)]))
+
+    def test_block_on_max_buffered(self):
+        writer = flit.SegmentWriter(max_buffered=10)
+        writer.write(self.path('a'), b'12345678')
+        blocked = Thread(target=writer.write,
+                         args=(self.path('a'), b'abcdefgh'))
+        blocked.start()
+        blocked.join(0.2)
+        self.assertTrue(blocked.is_alive())
+
+        writer.start()
+        blocked.join(1)
+        self.assertFalse(blocked.is_alive())
+        writer.close()
+        self.assertEqual(self.read('a'), b'12345678abcdefgh')
+
+    def test_open_error(self):
+        writer = flit.SegmentWriter()
+        writer.start()
+        filename = self.path('missing/a')
+        writer.write(filename, b'data')
+        while writer.error is None:
+            time.sleep(0.01)
+        self.assertRaises(IOError, writer.write, filename, b'data')
+        self.assertRaises(IOError, writer.close)
+
+
+class SegmentsTest(ServerTestCase):
+
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.directory = tempfile.mkdtemp()
+        os.chdir(self.directory)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.directory)
+
+    def test_flit_segments(self):
+        flit.flit_segments(self.server.url('/file'), 7, flit.get_opener())
+        with open('file', 'rb') as f:
+            self.assertEqual(f.read(), DATA)
+        self.assertEqual(os.listdir('.'), ['file'])
+
+
+if __name__ == '__main__':
+    unittest.main()
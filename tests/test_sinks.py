@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from pyflit import sinks
+
+
+def chunks(count, consumed):
+    for i in range(count):
+        consumed.append(i)
+        yield {'url': 'http://www.domain.com/%d' % i,
+               'status_code': 200,
+               'headers': None,
+               'content': b'content %d' % i}
+
+
+class BrokenSink(sinks.JSONLSink):
+
+    def serialize(self, chunk):
+        raise IOError("disk full")
+
+
+class PrefixSink(sinks.JSONLSink):
+
+    def __init__(self, directory, **kwargs):
+        sinks.JSONLSink.__init__(self, directory, **kwargs)
+        self.record_prefix = b'archived: '
+
+    def serialize(self, chunk):
+        return self.record_prefix + sinks.JSONLSink.serialize(self, chunk)
+
+
+class SinkTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_jsonl_index(self):
+        sink = sinks.JSONLSink(self.directory, segment_size=300)
+        self.assertEqual(sink.consume(chunks(10, [])), 10)
+
+        index = sinks.load_index(sink.index_path)
+        self.assertEqual(len(index), 10)
+        self.assertTrue(len(set(v[0] for v in index.values())) > 1)
+        filename, offset, length = index['http://www.domain.com/7']
+        record = sinks.read_record(os.path.join(self.directory, filename),
+                                   offset, length)
+        self.assertIn(b'"url": "http://www.domain.com/7"', record)
+
+    def test_warc_record(self):
+        sink = sinks.WARCSink(self.directory)
+        sink.consume(chunks(1, []))
+        filename, offset, length = \
+            sinks.load_index(sink.index_path)['http://www.domain.com/0']
+        record = sinks.read_record(os.path.join(self.directory, filename),
+                                   offset, length)
+        self.assertTrue(record.startswith(b'WARC/1.0\r\n'))
+        self.assertIn(b'\r\n\r\ncontent 0\r\n\r\n', record)
+
+    def test_subclass_attributes(self):
+        sink = PrefixSink(self.directory)
+        self.assertEqual(sink.consume(chunks(3, [])), 3)
+        filename, offset, length = \
+            sinks.load_index(sink.index_path)['http://www.domain.com/2']
+        record = sinks.read_record(os.path.join(self.directory, filename),
+                                   offset, length)
+        self.assertTrue(record.startswith(b'archived: '))
+
+    def test_new_segment_each_run(self):
+        sinks.JSONLSink(self.directory).consume(chunks(2, []))
+        sinks.JSONLSink(self.directory).consume(chunks(2, []))
+        self.assertEqual(sorted(os.listdir(self.directory)),
+                         ['pyflit-00000.jsonl.gz',
+                          'pyflit-00001.jsonl.gz',
+                          'pyflit.idx'])
+
+    def test_close_without_write(self):
+        sinks.WARCSink(self.directory).close()
+        self.assertEqual(os.listdir(self.directory), ['pyflit.idx'])
+
+    def test_stop_on_error(self):
+        consumed = []
+        sink = BrokenSink(self.directory, max_pending=1)
+        self.assertRaises(IOError, sink.consume, chunks(1000, consumed))
+        self.assertTrue(len(consumed) < 1000)
+
+
+if __name__ == '__main__':
+    unittest.main()